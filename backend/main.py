@@ -1,15 +1,65 @@
+import hashlib
+import heapq
 import os
 import re
-import uuid
 import shutil
 import asyncio
-import json
+import tempfile
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from functools import cache, lru_cache
 from pathlib import Path
 from typing import Optional
-from urllib.parse import quote
+from urllib.parse import quote_from_bytes, unquote, urlsplit
 
-# Locate yt-dlp regardless of whether it's on PATH
-def _find_ytdlp() -> str:
+import httpx
+import orjson
+import redis.asyncio as aioredis
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
+from pydantic import BaseModel
+from starlette.background import BackgroundTask
+
+# Optional Redis cache for /api/info responses. Enabled by setting REDIS_URL;
+# repeat lookups then skip the multi-second yt-dlp spawn entirely.
+REDIS_URL = os.getenv("REDIS_URL", "")
+CACHE_TTL = int(os.getenv("CACHE_TTL", "600"))
+
+
+# One app-lifetime HTTP client: keep-alive connections to popular CDNs stay
+# warm across requests instead of paying TCP+TLS setup per call.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.http = httpx.AsyncClient(
+        follow_redirects=True,
+        http2=True,
+        timeout=httpx.Timeout(10, read=None),
+        limits=httpx.Limits(
+            max_connections=100,
+            max_keepalive_connections=50,
+            keepalive_expiry=30,
+        ),
+    )
+    app.state.redis = aioredis.from_url(REDIS_URL) if REDIS_URL else None
+    yield
+    if app.state.redis is not None:
+        await app.state.redis.aclose()
+    await app.state.http.aclose()
+
+
+app = FastAPI(
+    title="LinkDrop Backend",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
+
+
+# Locate yt-dlp regardless of whether it's on PATH. Resolved lazily on first
+# use (and cached) so import / cold start doesn't pay the stat() probes.
+@cache
+def _ytdlp_path() -> str:
     candidate = shutil.which("yt-dlp")
     if candidate:
         return candidate
@@ -25,17 +75,6 @@ def _find_ytdlp() -> str:
             return str(p)
     raise RuntimeError("yt-dlp not found — run: pip3 install yt-dlp")
 
-import httpx
-
-YTDLP = _find_ytdlp()
-import aiofiles
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
-
-app = FastAPI(title="LinkDrop Backend")
-
 CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*").split(",")
 
 app.add_middleware(
@@ -59,9 +98,77 @@ QUALITY_LABELS = {
     480: "480p", 360: "360p", 240: "240p", 144: "144p",
 }
 
+# Flat height→label table built once at import: every height within 12% of a
+# standard tier (handles 652→720p, 270→240p, etc.) maps straight to its label,
+# so the per-format tolerance loop collapses to one dict lookup. Exact tiers
+# are seeded first and earlier (larger) tiers win band overlaps, matching the
+# original first-match-in-order semantics.
+_HEIGHT_LOOKUP: dict[int, str] = dict(QUALITY_LABELS)
+for _qh in QUALITY_HEIGHTS:
+    for _h in range(int(_qh * 0.88) - 1, int(_qh * 1.12) + 2):
+        if _h > 0 and abs(_h - _qh) / _qh <= 0.12:
+            _HEIGHT_LOOKUP.setdefault(_h, QUALITY_LABELS[_qh])
+del _qh, _h
+
 # Platforms that need browser cookies to return proper format lists
 COOKIE_PLATFORMS = {"tiktok", "instagram", "twitter", "facebook"}
 
+# Concurrency caps: unbounded parallel extractions/downloads would let a
+# traffic spike OOM a small host. Held only while yt-dlp itself runs, never
+# while bytes stream to the client.
+INFO_SEM = asyncio.Semaphore(int(os.getenv("INFO_CONCURRENCY", "8")))
+DL_SEM = asyncio.Semaphore(int(os.getenv("DL_CONCURRENCY", "4")))
+
+# Pre-compiled patterns for the hot format-parsing path
+_LABEL_RE = re.compile(r"(\d{3,4})p")
+_TIKTOK_DUP_RE = re.compile(r"-[01]$")
+
+# "No codec" sentinel values as extractors report them
+_NO_CODEC = frozenset({"none", None})
+
+# Short-lived /api/info cache: a user pasting a URL and then picking a format
+# hits the endpoint twice within seconds — don't spawn yt-dlp twice for that.
+INFO_CACHE_TTL = 60  # seconds
+_info_cache: dict[str, tuple[float, dict]] = {}
+_info_locks: dict[str, asyncio.Lock] = {}
+
+
+def _info_cache_get(url: str) -> Optional[dict]:
+    entry = _info_cache.get(url)
+    if entry and time.time() - entry[0] < INFO_CACHE_TTL:
+        return entry[1]
+    return None
+
+
+def _info_cache_put(url: str, payload: dict) -> None:
+    # Opportunistic eviction keeps the dict bounded without a background task
+    if len(_info_cache) > 512:
+        now = time.time()
+        for k in [k for k, (ts, _) in _info_cache.items() if now - ts >= INFO_CACHE_TTL]:
+            del _info_cache[k]
+    _info_cache[url] = (time.time(), payload)
+
+
+# Redis layer: shared across workers and longer-lived than the local dict.
+# All Redis faults degrade to a miss — the cache must never break a request.
+def _redis_key(url: str) -> str:
+    return "info:" + hashlib.sha1(url.encode()).hexdigest()
+
+
+async def _redis_info_get(key: str) -> Optional[dict]:
+    try:
+        raw = await app.state.redis.get(key)
+        return orjson.loads(raw) if raw else None
+    except Exception:
+        return None
+
+
+async def _redis_info_put(key: str, payload: dict) -> None:
+    try:
+        await app.state.redis.set(key, orjson.dumps(payload), ex=CACHE_TTL)
+    except Exception:
+        pass
+
 
 class InfoRequest(BaseModel):
     url: str
@@ -79,56 +186,71 @@ async def resolve_real_url(url: str) -> str:
     Detect this and return the actual media URL.
     """
     try:
-        async with httpx.AsyncClient(follow_redirects=True, timeout=10) as client:
-            # Use GET with a small range to check Content-Type
-            head = await client.head(url)
-            ct = head.headers.get("content-type", "").split(";")[0].strip().lower()
-
-            if ct.startswith("text/html"):
-                # URL looks like media but returned HTML — try CDN pattern.
-                # Common pattern: interstitial.domain.com/file → cdn.domain.com/file
-                from urllib.parse import urlparse
-                parsed = urlparse(url)
-                parts = parsed.hostname.split(".")
-
-                # Try replacing first subdomain with "cdn"
-                if len(parts) >= 2:
-                    base_domain = ".".join(parts[-2:]) if len(parts) >= 2 else parsed.hostname
-                    cdn_url = f"{parsed.scheme}://cdn.{base_domain}{parsed.path}"
-                    if parsed.query:
-                        cdn_url += f"?{parsed.query}"
-
-                    # Verify the CDN URL returns actual media
-                    try:
-                        cdn_head = await client.head(cdn_url)
-                        cdn_ct = cdn_head.headers.get("content-type", "").split(";")[0].strip().lower()
-                        if not cdn_ct.startswith("text/html"):
-                            return cdn_url
-                    except Exception:
-                        pass
-
-                # Also try stripping subdomain entirely
-                if len(parts) >= 3:
-                    bare_url = f"{parsed.scheme}://{base_domain}{parsed.path}"
-                    if parsed.query:
-                        bare_url += f"?{parsed.query}"
-                    try:
-                        bare_head = await client.head(bare_url)
-                        bare_ct = bare_head.headers.get("content-type", "").split(";")[0].strip().lower()
-                        if not bare_ct.startswith("text/html"):
-                            return bare_url
-                    except Exception:
-                        pass
+        client = app.state.http
+        head = await client.head(url, timeout=10)
+        ct = head.headers.get("content-type", "").split(";")[0].strip().lower()
+
+        if ct.startswith("text/html"):
+            # URL looks like media but returned HTML — try CDN pattern.
+            # Common pattern: interstitial.domain.com/file → cdn.domain.com/file
+            from urllib.parse import urlparse
+            parsed = urlparse(url)
+            parts = parsed.hostname.split(".")
+
+            # Try replacing first subdomain with "cdn"
+            if len(parts) >= 2:
+                base_domain = ".".join(parts[-2:]) if len(parts) >= 2 else parsed.hostname
+                cdn_url = f"{parsed.scheme}://cdn.{base_domain}{parsed.path}"
+                if parsed.query:
+                    cdn_url += f"?{parsed.query}"
+
+                # Verify the CDN URL returns actual media
+                try:
+                    cdn_head = await client.head(cdn_url, timeout=10)
+                    cdn_ct = cdn_head.headers.get("content-type", "").split(";")[0].strip().lower()
+                    if not cdn_ct.startswith("text/html"):
+                        return cdn_url
+                except Exception:
+                    pass
+
+            # Also try stripping subdomain entirely
+            if len(parts) >= 3:
+                bare_url = f"{parsed.scheme}://{base_domain}{parsed.path}"
+                if parsed.query:
+                    bare_url += f"?{parsed.query}"
+                try:
+                    bare_head = await client.head(bare_url, timeout=10)
+                    bare_ct = bare_head.headers.get("content-type", "").split(";")[0].strip().lower()
+                    if not bare_ct.startswith("text/html"):
+                        return bare_url
+                except Exception:
+                    pass
     except Exception:
         pass
 
     return url
 
 
+def _url_filename(url: str) -> str:
+    """Last path segment of a URL, percent-decoded, or 'file' as a fallback."""
+    return unquote(urlsplit(url).path.rsplit("/", 1)[-1]) or "file"
+
+
+_DISPO_SAFE = b" .-_"
+
+
+@lru_cache(maxsize=1024)
 def content_disposition(filename: str) -> str:
     """RFC 5987 safe Content-Disposition header (supports non-ASCII filenames)."""
+    try:
+        # Pure-ASCII names (the vast majority) need no encoded variant at all.
+        filename.encode("ascii")
+        return f'attachment; filename="{filename}"'
+    except UnicodeEncodeError:
+        pass
     ascii_name = filename.encode("ascii", "ignore").decode("ascii") or "download"
-    utf8_name = quote(filename, safe=" .-_")
+    # quote_from_bytes skips urllib's per-call str handling and safe-table setup
+    utf8_name = quote_from_bytes(filename.encode("utf-8"), _DISPO_SAFE)
     return f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{utf8_name}"
 
 
@@ -148,14 +270,41 @@ PLATFORM_PATTERNS = {
 }
 
 
-def detect_platform(url: str) -> str:
-    url_lower = url.lower()
-    for platform, domains in PLATFORM_PATTERNS.items():
-        if any(d in url_lower for d in domains):
+# Flat domain → platform table: host matching becomes a dict lookup per
+# suffix component instead of a substring scan, and exact-suffix semantics
+# mean "nottiktok.com" no longer matches "tiktok.com".
+_DOMAIN_TO_PLATFORM = {
+    domain: platform
+    for platform, domains in PLATFORM_PATTERNS.items()
+    for domain in domains
+}
+
+
+@lru_cache(maxsize=1024)
+def _platform_for_host(host: str) -> str:
+    # Walk suffixes ("m.youtube.com" → "youtube.com" → "com") so any
+    # subdomain of a known platform domain matches.
+    parts = host.split(".")
+    for i in range(len(parts) - 1):
+        platform = _DOMAIN_TO_PLATFORM.get(".".join(parts[i:]))
+        if platform:
             return platform
     return "direct"
 
 
+def detect_platform(url: str) -> str:
+    # Only the hostname carries the platform signal; memoising on it means
+    # repeat requests to the same site cost one dict lookup.
+    host = urlsplit(url).hostname
+    if not host:
+        # Scheme-less input: take everything before the first slash instead of
+        # lowercasing the whole URL (signed CDN query strings can be huge).
+        host = url.split("/", 1)[0]
+        if not host:
+            return "direct"
+    return _platform_for_host(host.lower())
+
+
 def build_ytdlp_flags(platform: str) -> list[str]:
     """Return platform-appropriate yt-dlp flags."""
     if platform == "youtube":
@@ -165,17 +314,28 @@ def build_ytdlp_flags(platform: str) -> list[str]:
     return []
 
 
+# Static argv pieces, materialised once: per-request command building only
+# appends the dynamic parts (format selector, output target, URL).
+_DL_ARGS = ("--no-playlist", "--no-warnings")
+_FLAGS_CACHE: dict[str, tuple[str, ...]] = {
+    p: tuple(build_ytdlp_flags(p)) for p in (*PLATFORM_PATTERNS, "direct")
+}
+
+CONTENT_TYPE_MAP = {
+    ".mp4": "video/mp4",
+    ".webm": "video/webm",
+    ".mkv": "video/x-matroska",
+    ".mp3": "audio/mpeg",
+    ".m4a": "audio/mp4",
+    ".opus": "audio/opus",
+}
+
+
 def _height_to_label(height: int) -> str:
     """Map a height value to a quality label string."""
     if not height:
         return "Unknown"
-    if height in QUALITY_LABELS:
-        return QUALITY_LABELS[height]
-    # Within 12% of a standard tier (handles 652→720p, 576→540p, 270→240p, etc.)
-    for qh in QUALITY_HEIGHTS:
-        if abs(height - qh) / qh <= 0.12:
-            return QUALITY_LABELS[qh]
-    return f"{height}p"
+    return _HEIGHT_LOOKUP.get(height) or f"{height}p"
 
 
 def _label_from_format_id(format_id: str) -> Optional[str]:
@@ -183,16 +343,26 @@ def _label_from_format_id(format_id: str) -> Optional[str]:
     Try to extract quality label from format_id.
     e.g. 'h264_720p_1349035-0' → '720p'
     """
-    m = re.search(r"(\d{3,4})p", format_id)
+    m = _LABEL_RE.search(format_id)
     if m:
         p = int(m.group(1))
         return QUALITY_LABELS.get(p, f"{p}p")
     return None
 
 
-def _codec_priority(fmt: dict) -> int:
+# Hot sort keys: dict.get bound as a default argument so the descriptor lookup
+# happens once at definition time, not per call inside O(n log n) sorts.
+def _audio_rank(a: dict, _get=dict.get) -> float:
+    return _get(a, "abr") or _get(a, "tbr") or 0
+
+
+def _bitrate(f: dict, _get=dict.get) -> float:
+    return _get(f, "tbr") or _get(f, "vbr") or 0
+
+
+def _codec_priority(fmt: dict, _get=dict.get) -> int:
     """Return sort priority for video codec (higher = more compatible)."""
-    vc = (fmt.get("vcodec") or "").lower()
+    vc = (_get(fmt, "vcodec") or "").lower()
     if "h264" in vc or "avc" in vc:
         return 3
     if "vp9" in vc or "vp8" in vc:
@@ -213,37 +383,43 @@ def parse_formats(raw_formats: list) -> list:
     if not raw_formats:
         return [{"id": "best", "ext": "mp4", "quality": "Best", "filesize": None}]
 
-    # video-only: has vcodec, no audio, has height
-    video_only = [
-        f for f in raw_formats
-        if f.get("vcodec") not in ("none", None)
-        and f.get("acodec") in ("none", None)
-        and f.get("height")
-    ]
-    # audio-only: no video, no height, has audio
-    # Note: some extractors (X/Twitter HLS) leave acodec=None but set abr>0
-    audio_only = [
-        f for f in raw_formats
-        if f.get("vcodec") in ("none", None)
-        and not f.get("height")
-        and (f.get("acodec") not in ("none", None) or (f.get("abr") or 0) > 0)
-    ]
-    # explicitly combined: both codecs set (TikTok, Instagram)
-    combined_explicit = [
-        f for f in raw_formats
-        if f.get("vcodec") not in ("none", None)
-        and f.get("acodec") not in ("none", None)
-        and f.get("height")
-    ]
-    # muxed progressive: both codecs=None but has height (X/Twitter http-*, Instagram fmt 8)
-    # Note: tbr may be None for some pre-muxed streams (e.g., Instagram format "8")
-    combined_muxed = [
-        f for f in raw_formats
-        if f.get("vcodec") is None
-        and f.get("acodec") is None
-        and f.get("height")
-    ]
-    combined = combined_explicit + combined_muxed
+    # No single-format short-circuit: one combined stream (the common
+    # TikTok/Instagram case) still needs the portrait-aware labeling and the
+    # audio-only entry below, and the single pass is already O(1) for n=1.
+
+    # Single pass: classify each format once and track max heights inline.
+    # video-only   : has vcodec, no audio, has height
+    # audio-only   : no video, no height, has audio
+    #                (some extractors — X/Twitter HLS — leave acodec=None but set abr>0)
+    # combined     : both codecs set (TikTok, Instagram), or both None with a
+    #                height (muxed progressive: X/Twitter http-*, Instagram fmt 8;
+    #                tbr may also be None for these pre-muxed streams)
+    video_only: list[dict] = []
+    audio_only: list[dict] = []
+    combined: list[dict] = []
+    combined_muxed: list[dict] = []
+    max_vid_h = 0
+    max_comb_h = 0
+    for f in raw_formats:
+        vcodec = f.get("vcodec")
+        acodec = f.get("acodec")
+        height = f.get("height")
+        has_video = vcodec not in _NO_CODEC
+        has_audio = acodec not in _NO_CODEC
+        if has_video and not has_audio and height:
+            video_only.append(f)
+            if height > max_vid_h:
+                max_vid_h = height
+        elif not has_video and not height and (has_audio or (f.get("abr") or 0) > 0):
+            audio_only.append(f)
+        elif height and (has_video and has_audio or vcodec is None and acodec is None):
+            # Explicit-codec entries go before muxed ones so that at equal
+            # codec priority and bitrate the per-height tie-break ("first
+            # seen wins") picks the explicit stream, as it always has.
+            (combined if has_video else combined_muxed).append(f)
+            if height > max_comb_h:
+                max_comb_h = height
+    combined += combined_muxed
 
     formats: list[dict] = []
 
@@ -251,15 +427,13 @@ def parse_formats(raw_formats: list) -> list:
     # Prefer DASH when its max resolution exceeds combined streams (YouTube case:
     # video_only goes up to 4K while combined has only format-18 at 360p).
     # For X/Twitter: combined muxed streams match video_only resolution → social path.
-    max_vid_h = max((f.get("height", 0) for f in video_only), default=0)
-    max_comb_h = max((f.get("height", 0) for f in combined), default=0)
     use_dash = video_only and audio_only and (not combined or max_vid_h > max_comb_h)
 
     if use_dash:
         # Pick best audio stream (prefer m4a)
         m4a_streams = [a for a in audio_only if a.get("ext") == "m4a"]
         audio_pool = m4a_streams if m4a_streams else audio_only
-        best_audio = max(audio_pool, key=lambda a: a.get("abr") or a.get("tbr") or 0)
+        best_audio = max(audio_pool, key=_audio_rank)
         audio_size = best_audio.get("filesize") or best_audio.get("filesize_approx") or 0
         best_audio_id = best_audio.get("format_id")
 
@@ -278,11 +452,12 @@ def parse_formats(raw_formats: list) -> list:
             if f_mp4 and not p_mp4:
                 vid_by_height[h] = f
             elif f_mp4 == p_mp4:
-                if (f.get("tbr") or f.get("vbr") or 0) > (prev.get("tbr") or prev.get("vbr") or 0):
+                if _bitrate(f) > _bitrate(prev):
                     vid_by_height[h] = f
 
+        # Only the top tiers are ever shown — O(n log k) top-k beats a full sort
         seen: set[str] = set()
-        for h in sorted(vid_by_height.keys(), reverse=True):
+        for h in heapq.nlargest(len(QUALITY_HEIGHTS), vid_by_height):
             best_vid = vid_by_height[h]
             fmt_id = f"{best_vid['format_id']}+{best_audio_id}"
             if fmt_id in seen:
@@ -311,7 +486,7 @@ def parse_formats(raw_formats: list) -> list:
     elif combined:
         # TikTok duplicates: format IDs end in -0 and -1 (identical streams)
         has_tiktok_dupes = any(
-            re.search(r"-[01]$", f.get("format_id", "")) for f in combined
+            _TIKTOK_DUP_RE.search(f.get("format_id", "")) for f in combined
         )
         if has_tiktok_dupes:
             combined = [f for f in combined if not f.get("format_id", "").endswith("-1")]
@@ -331,12 +506,10 @@ def parse_formats(raw_formats: list) -> list:
             if f_pri > p_pri:
                 best_per_height[h] = f
             elif f_pri == p_pri:
-                f_tbr = f.get("tbr") or f.get("vbr") or 0
-                p_tbr = prev.get("tbr") or prev.get("vbr") or 0
-                if f_tbr > p_tbr:
+                if _bitrate(f) > _bitrate(prev):
                     best_per_height[h] = f
 
-        for h in sorted(best_per_height.keys(), reverse=True):
+        for h in heapq.nlargest(len(QUALITY_HEIGHTS), best_per_height):
             best = best_per_height[h]
             width = best.get("width") or 0
             is_portrait = h > width > 0
@@ -369,64 +542,282 @@ def parse_formats(raw_formats: list) -> list:
     return formats
 
 
-async def _run_ytdlp_info(url: str, extra_flags: list[str]) -> Optional[dict]:
+# Singleflight for identical concurrent staged downloads: the first request
+# runs yt-dlp, later ones await the same staged file. Each entry counts its
+# active consumers so the tmp dir is removed only after the last response
+# body has been sent. All bookkeeping runs on the event loop.
+_inflight: dict[tuple[str, str], dict] = {}
+
+
+def _join_inflight(key: tuple[str, str]) -> Optional[dict]:
+    entry = _inflight.get(key)
+    if entry is not None:
+        entry["refs"] += 1
+    return entry
+
+
+async def _rmtree(path: Path) -> None:
+    """rmtree without blocking the event loop (runs in the thread pool)."""
+    await asyncio.to_thread(shutil.rmtree, path, ignore_errors=True)
+
+
+async def _release_inflight(key: tuple[str, str], entry: dict) -> None:
+    entry["refs"] -= 1
+    if entry["refs"] <= 0:
+        _inflight.pop(key, None)
+        if entry["tmp_dir"] is not None:
+            await _rmtree(entry["tmp_dir"])
+
+
+def _fail_inflight(
+    key: tuple[str, str], entry: dict, exc: Optional[Exception] = None
+) -> None:
+    _inflight.pop(key, None)
+    fut = entry["fut"]
+    if not fut.done():
+        if exc is not None:
+            # Store the leader's error so waiters surface the same detail
+            # (e.g. a 504 timeout) instead of a generic failure.
+            fut.set_exception(exc)
+            # Mark retrieved: with zero waiters nothing ever awaits the
+            # future, which would otherwise log an unhandled exception.
+            fut.exception()
+        else:
+            fut.cancel()
+
+
+def _niceify() -> None:
+    """Drop subprocess scheduling priority (runs in the child pre-exec).
+
+    yt-dlp's ffmpeg merges can saturate CPU; nicing them keeps the event
+    loop thread responsive for concurrent requests.
     """
-    Run yt-dlp --dump-json with given flags.
-    Returns parsed JSON dict, or None on failure.
+    os.nice(10)
+
+
+# Progress lines on the `-o -` paths are \r-separated (yt-dlp only emits a
+# newline at 100%), so both terminators delimit a "line".
+_LINE_SEP_RE = re.compile(rb"[\r\n]")
+
+
+async def _drain_stderr(proc, tail: deque) -> None:
     """
-    proc = await asyncio.create_subprocess_exec(
-        YTDLP,
-        "--dump-json",
-        "--no-playlist",
-        "--no-warnings",
-        *extra_flags,
-        url,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-    )
-    try:
-        stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=30)
-    except asyncio.TimeoutError:
-        proc.kill()
-        return None
+    Drain a subprocess stderr pipe, keeping only the last lines for
+    diagnostics. Prevents a chatty yt-dlp from filling the 64 KiB kernel pipe
+    buffer (which would stall it) without buffering megabytes of progress
+    output in memory.
+
+    Reads fixed-size chunks rather than readline(): streamed downloads write
+    minutes of \r-separated progress with no newline, which would overrun the
+    StreamReader line limit, kill the drain and deadlock yt-dlp.
+    """
+    buf = b""
+    while chunk := await proc.stderr.read(4096):
+        *lines, buf = _LINE_SEP_RE.split(buf + chunk)
+        tail.extend(line + b"\n" for line in lines if line)
+    if buf:
+        tail.append(buf + b"\n")
+
+
+def _build_ydl_opts(platform: str, use_cookies: bool = True) -> dict:
+    """yt_dlp.YoutubeDL options mirroring the CLI flags used for downloads."""
+    opts: dict = {
+        "quiet": True,
+        "no_warnings": True,
+        "noplaylist": True,
+        "skip_download": True,
+        # Metadata-only calls shouldn't hang on a slow extractor endpoint or
+        # probe formats we never fetch.
+        "socket_timeout": 10,
+        "retries": 2,
+        "check_formats": False,
+    }
+    if platform == "youtube":
+        opts["extractor_args"] = {"youtube": {"player_client": [YT_CLIENT]}}
+    elif use_cookies and platform in COOKIE_PLATFORMS and COOKIES_BROWSER:
+        opts["cookiesfrombrowser"] = (COOKIES_BROWSER,)
+    return opts
 
-    if proc.returncode != 0 or not stdout:
-        return None
+
+def _extract_info_sync(url: str, opts: dict) -> Optional[dict]:
+    # Deferred import: the ~300ms yt_dlp import is paid once, on the first
+    # info request, inside a worker thread — not at server cold start.
+    import yt_dlp
 
     try:
-        info = json.loads(stdout.decode())
-    except json.JSONDecodeError:
+        with yt_dlp.YoutubeDL(opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+    except Exception:
         return None
 
-    extractor = info.get("extractor_key", "Generic")
-    if extractor == "Generic":
+    if not info or info.get("extractor_key", "Generic") == "Generic":
         return None  # treat as direct file
 
+    # Classify formats while still on the worker thread, so the event loop
+    # never runs the CPU-bound parse for large DASH lists.
+    info["parsed_formats"] = parse_formats(info.get("formats", []))
     return info
 
 
+async def _run_ytdlp_info(url: str, opts: dict) -> Optional[dict]:
+    """
+    Extract metadata in-process via the yt-dlp Python API.
+    Returns the info dict, or None on failure.
+
+    Running in a worker thread skips the per-call interpreter startup and
+    yt-dlp import (~300-700ms) the old --dump-json subprocess paid, and the
+    JSON serialize/parse round-trip with it.
+    """
+    async with INFO_SEM:
+        try:
+            return await asyncio.wait_for(
+                asyncio.to_thread(_extract_info_sync, url, opts), timeout=30
+            )
+        except asyncio.TimeoutError:
+            return None
+
+
+async def _direct_file_info(url: str) -> dict:
+    """Probe a URL as a plain file (mp4, pdf, jpg, ...) and build the
+    /api/info payload from its response headers."""
+    # Resolve HTML interstitial pages to actual media URLs
+    resolved = await resolve_real_url(url)
+
+    head = await app.state.http.head(resolved, timeout=10)
+    content_type = head.headers.get("content-type", "application/octet-stream").split(";")[0].strip()
+    content_length = head.headers.get("content-length")
+    # One urlsplit + splitext instead of chained str.split allocations
+    filename = _url_filename(resolved)
+    ext = os.path.splitext(filename)[1][1:].lower() or content_type.split("/")[-1]
+
+    return {
+        "title": filename,
+        "thumbnail": None,
+        "duration": None,
+        "platform": "direct",
+        "is_direct": True,
+        "direct_url": resolved,
+        "formats": [{
+            "id": "direct",
+            "ext": ext,
+            "quality": "Original",
+            "filesize": int(content_length) if content_length else None,
+        }],
+        "uploader": None,
+        "view_count": None,
+    }
+
+
 @app.get("/api/health")
 async def health():
     return {"status": "ok"}
 
 
+@app.get("/api/info")
+async def get_info_get(url: str, request: Request, response: Response):
+    """GET alias — lets browsers and CDNs participate in response caching."""
+    return await get_info(InfoRequest(url=url), request, response)
+
+
 @app.post("/api/info")
-async def get_info(req: InfoRequest):
+async def get_info(req: InfoRequest, request: Request, response: Response):
     url = req.url.strip()
     platform = detect_platform(url)
 
-    # 1) Try yt-dlp with platform-specific flags
-    flags = build_ytdlp_flags(platform)
-    info = await _run_ytdlp_info(url, flags)
-
-    # 2) If that failed AND we used cookies, retry without cookies
-    #    (handles environments without a browser, e.g. Docker on Render)
-    if info is None and "--cookies-from-browser" in flags:
-        info = await _run_ytdlp_info(url, [])
+    # Client-side caching: the ETag is keyed on the URL, so within the
+    # Cache-Control window a revalidating browser gets an empty 304 and the
+    # backend does zero extraction work.
+    etag = f'W/"{hashlib.sha1(url.encode()).hexdigest()}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = f"public, max-age={CACHE_TTL}"
+
+    cached = _info_cache_get(url)
+    if cached is not None:
+        response.headers["X-Cache"] = "HIT"
+        return cached
+
+    # Local singleflight: concurrent requests for the same URL queue behind
+    # one extraction and then hit the cache, instead of each running yt-dlp.
+    lock = _info_locks.setdefault(url, asyncio.Lock())
+    try:
+        async with lock:
+            cached = _info_cache_get(url)
+            if cached is not None:
+                response.headers["X-Cache"] = "HIT"
+                return cached
+            return await _fetch_info(url, platform, response)
+    finally:
+        if not lock.locked():
+            _info_locks.pop(url, None)
+
+
+async def _fetch_info(url: str, platform: str, response: Response) -> dict:
+    """Cache-miss path for /api/info: consult Redis, run extraction (racing
+    the direct-file probe), and populate both cache layers."""
+    redis_key = None
+    if app.state.redis is not None:
+        redis_key = _redis_key(url)
+        cached = await _redis_info_get(redis_key)
+        if cached is not None:
+            _info_cache_put(url, cached)
+            response.headers["X-Cache"] = "HIT"
+            return cached
+
+        # Collapse a thundering herd on the same URL: the first caller takes a
+        # short NX lock and runs yt-dlp, the rest poll the cache instead of
+        # each spawning their own subprocess.
+        try:
+            got_lock = await app.state.redis.set(
+                "lock:" + redis_key, "1", nx=True, ex=30
+            )
+        except Exception:
+            got_lock = True
+        if not got_lock:
+            for _ in range(50):
+                await asyncio.sleep(0.2)
+                cached = await _redis_info_get(redis_key)
+                if cached is not None:
+                    _info_cache_put(url, cached)
+                    response.headers["X-Cache"] = "HIT"
+                    return cached
+            # Lock holder died or is slow — do the work ourselves.
+
+    response.headers["X-Cache"] = "MISS"
+
+    # Probe the direct-file interpretation concurrently with extraction, so a
+    # URL that turns out to be a plain file doesn't pay the yt-dlp latency
+    # and the HEAD round-trip in sequence.
+    direct_task = asyncio.create_task(_direct_file_info(url))
+
+    # 1) Try yt-dlp with platform-specific options. When cookies are involved,
+    #    run the cookie-less probe speculatively in parallel: cookies often
+    #    fail in environments without a browser (e.g. Docker on Render), and
+    #    a serial retry would double the latency exactly in that case.
+    if platform in COOKIE_PLATFORMS and COOKIES_BROWSER:
+        cookie_task = asyncio.create_task(
+            _run_ytdlp_info(url, _build_ydl_opts(platform))
+        )
+        plain_task = asyncio.create_task(
+            _run_ytdlp_info(url, _build_ydl_opts(platform, use_cookies=False))
+        )
+        info = await cookie_task
+        if info is None:
+            info = await plain_task
+        else:
+            plain_task.cancel()
+    else:
+        info = await _run_ytdlp_info(url, _build_ydl_opts(platform))
 
     if info is not None:
-        formats = parse_formats(info.get("formats", []))
-        return {
+        direct_task.cancel()
+        try:
+            await direct_task
+        except (Exception, asyncio.CancelledError):
+            pass
+        formats = info["parsed_formats"]
+        payload = {
             "title": info.get("title", "Untitled"),
             "thumbnail": info.get("thumbnail"),
             "duration": info.get("duration"),
@@ -436,38 +827,65 @@ async def get_info(req: InfoRequest):
             "uploader": info.get("uploader") or info.get("channel"),
             "view_count": info.get("view_count"),
         }
+        _info_cache_put(url, payload)
+        if redis_key is not None:
+            await _redis_info_put(redis_key, payload)
+            try:
+                await app.state.redis.delete("lock:" + redis_key)
+            except Exception:
+                pass
+        return payload
 
     # 3) Fallback: treat as direct file (mp4, pdf, jpg, etc.)
     try:
-        # Resolve HTML interstitial pages to actual media URLs
-        resolved = await resolve_real_url(url)
-
-        async with httpx.AsyncClient(follow_redirects=True, timeout=10) as client:
-            head = await client.head(resolved)
-            content_type = head.headers.get("content-type", "application/octet-stream").split(";")[0].strip()
-            content_length = head.headers.get("content-length")
-            filename = resolved.split("?")[0].split("/")[-1] or "file"
-            ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else content_type.split("/")[-1]
-
-            return {
-                "title": filename,
-                "thumbnail": None,
-                "duration": None,
-                "platform": "direct",
-                "is_direct": True,
-                "direct_url": resolved,
-                "formats": [{
-                    "id": "direct",
-                    "ext": ext,
-                    "quality": "Original",
-                    "filesize": int(content_length) if content_length else None,
-                }],
-                "uploader": None,
-                "view_count": None,
-            }
+        payload = await direct_task
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Could not fetch URL info: {str(e)}")
 
+    # Cache the fallback too — repeat lookups otherwise re-run the failed
+    # extraction plus the HEAD probe on every call.
+    _info_cache_put(url, payload)
+    if redis_key is not None:
+        await _redis_info_put(redis_key, payload)
+        try:
+            await app.state.redis.delete("lock:" + redis_key)
+        except Exception:
+            pass
+    return payload
+
+
+_FILENAME_UNSAFE_RE = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+
+
+def _stream_filename(
+    url: str, format_id: str, ext: Optional[str] = None
+) -> tuple[str, str]:
+    """
+    Filename and media type for a stdout-piped download. The staged path gets
+    these from yt-dlp's %(title).80s.%(ext)s output template; piped downloads
+    have no file to name, so recover title/ext from the /api/info cache entry
+    the client just fetched (falling back to a generic name on a cold cache).
+    Pass ext to force the container (the mp3 transcode path ignores the
+    format's own extension).
+    """
+    title = None
+    cached = _info_cache_get(url)
+    if cached:
+        if ext is None:
+            fmt = next(
+                (f for f in cached.get("formats", ()) if f.get("id") == format_id),
+                None,
+            )
+            if fmt and fmt.get("ext"):
+                ext = fmt["ext"]
+        title = cached.get("title")
+    ext = ext or "mp4"
+    media_type = CONTENT_TYPE_MAP.get(f".{ext}", "video/mp4")
+    name = _FILENAME_UNSAFE_RE.sub("_", title)[:80].strip() if title else ""
+    if not name:
+        name = "audio" if media_type.startswith("audio/") else "video"
+    return f"{name}.{ext}", media_type
+
 
 @app.get("/api/download")
 async def download_get(url: str, format_id: str = "direct"):
@@ -485,113 +903,350 @@ async def download(req: DownloadRequest):
     if format_id == "direct":
         # Resolve HTML interstitial pages to actual media URLs
         resolved = await resolve_real_url(url)
-        filename = resolved.split("?")[0].split("/")[-1] or "file"
-
-        # HEAD first to get Content-Length and real Content-Type
-        content_length = None
-        media_type = "application/octet-stream"
-        try:
-            async with httpx.AsyncClient(follow_redirects=True, timeout=8) as hc:
-                head = await hc.head(resolved)
-                content_length = head.headers.get("content-length")
-                ct = head.headers.get("content-type", "").split(";")[0].strip()
-                if ct:
-                    media_type = ct
-        except Exception:
-            pass
-
-        async def stream_direct():
-            async with httpx.AsyncClient(follow_redirects=True, timeout=None) as client:
-                async with client.stream("GET", resolved) as response:
-                    async for chunk in response.aiter_bytes(chunk_size=65536):
-                        yield chunk
+        filename = _url_filename(resolved)
+
+        # Open the GET before building the response so Content-Length and
+        # Content-Type come from the request that actually serves the bytes —
+        # no separate HEAD round-trip, and the client sees the length from
+        # byte zero.
+        # identity: aiter_raw below bypasses httpx's decoder, so ask the
+        # origin not to compress (media files wouldn't be anyway, but txt/
+        # json/svg from some origins would come back gzipped).
+        upstream = await app.state.http.send(
+            app.state.http.build_request(
+                "GET", resolved, headers={"accept-encoding": "identity"}
+            ),
+            stream=True,
+        )
+        if upstream.status_code >= 400:
+            await upstream.aclose()
+            raise HTTPException(
+                status_code=502, detail=f"Upstream returned {upstream.status_code}"
+            )
 
+        media_type = (
+            upstream.headers.get("content-type", "").split(";")[0].strip()
+            or "application/octet-stream"
+        )
         headers: dict[str, str] = {"Content-Disposition": content_disposition(filename)}
+        content_length = upstream.headers.get("content-length")
         if content_length:
             headers["Content-Length"] = content_length
+        # If the origin compressed regardless, pass the encoding through so
+        # the client decodes it — we forward the raw bytes either way.
+        content_encoding = upstream.headers.get("content-encoding")
+        if content_encoding:
+            headers["Content-Encoding"] = content_encoding
+
+        # 1 MiB chunks: 16× fewer event-loop turns per GB than 64 KiB, and
+        # aiter_raw skips httpx's content-decoding layer (a no-op with the
+        # identity encoding requested above).
+        async def stream_direct():
+            try:
+                async for chunk in upstream.aiter_raw(1 << 20):
+                    yield chunk
+            finally:
+                await upstream.aclose()
 
         return StreamingResponse(stream_direct(), media_type=media_type, headers=headers)
 
-    # ── yt-dlp download ────────────────────────────────────────────────────────
-    tmp_dir = Path(f"/tmp/{uuid.uuid4()}")
-    tmp_dir.mkdir(parents=True, exist_ok=True)
+    # ── yt-dlp streaming download ──────────────────────────────────────────────
+    # A single already-muxed format can be piped straight from yt-dlp's stdout
+    # to the client: no tmp file, and the first byte reaches the user as soon
+    # as yt-dlp produces it. Merged (video+audio) downloads need ffmpeg with
+    # seekable output, so they fall through to the tmp-dir path.
+    if format_id and "+" not in format_id and "bestaudio" not in format_id:
+        flags = _FLAGS_CACHE[platform]
+        # Cap held through spawn + first chunk (the expensive extraction
+        # phase); streaming the remaining bytes doesn't hold a slot.
+        await DL_SEM.acquire()
+        proc = None
+        drain_task = None
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                _ytdlp_path(),
+                *_DL_ARGS,
+                *flags,
+                "-f", format_id,
+                "-o", "-",
+                url,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                preexec_fn=_niceify,
+            )
+
+            stderr_tail: deque[bytes] = deque(maxlen=50)
+            drain_task = asyncio.create_task(_drain_stderr(proc, stderr_tail))
+
+            # Wait for the first chunk before committing to a 200 response, so
+            # an immediate extractor failure still surfaces as a proper error.
+            # Bounded: a stalled extraction must not pin a semaphore slot.
+            try:
+                first_chunk = await asyncio.wait_for(
+                    proc.stdout.read(1 << 20), timeout=300
+                )
+            except asyncio.TimeoutError:
+                raise HTTPException(
+                    status_code=504, detail="Download timed out (5 min limit)"
+                )
+            if not first_chunk:
+                await proc.wait()
+                await drain_task
+                detail = b"".join(stderr_tail).decode(errors="replace")[-500:]
+                raise HTTPException(status_code=500, detail=f"Download failed: {detail}")
+        except BaseException:
+            # Any failure before the generator takes ownership (spawn error,
+            # timeout, cancellation) must not leave yt-dlp running.
+            if proc is not None and proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+            if drain_task is not None:
+                drain_task.cancel()
+            raise
+        finally:
+            DL_SEM.release()
+
+        async def stream_ytdlp():
+            try:
+                yield first_chunk
+                while chunk := await proc.stdout.read(1 << 20):
+                    yield chunk
+                await proc.wait()
+            finally:
+                # Runs on client disconnect too: StreamingResponse closes the
+                # generator, so the subprocess dies instead of downloading on.
+                if proc.returncode is None:
+                    proc.kill()
+                    await proc.wait()
+                drain_task.cancel()
+
+        filename, media_type = _stream_filename(url, format_id)
+        return StreamingResponse(
+            stream_ytdlp(),
+            media_type=media_type,
+            headers={"Content-Disposition": content_disposition(filename)},
+        )
+
+    # ── Audio extraction (piped transcode) ─────────────────────────────────────
+    # bestaudio used to stage the download, have yt-dlp re-invoke ffmpeg onto
+    # disk and then re-read the mp3 — three full passes over the audio. Chain
+    # yt-dlp's stdout into ffmpeg over a kernel pipe and stream ffmpeg's
+    # output instead: zero disk I/O and the first bytes reach the client as
+    # soon as ffmpeg emits its first mp3 frame.
+    if format_id and "bestaudio" in format_id and "+" not in format_id:
+        flags = _FLAGS_CACHE[platform]
+        pipe_r, pipe_w = os.pipe()
+        await DL_SEM.acquire()
+        ytdlp = None
+        ffmpeg = None
+        drain_task = None
+        try:
+            try:
+                ytdlp = await asyncio.create_subprocess_exec(
+                    _ytdlp_path(),
+                    *_DL_ARGS,
+                    *flags,
+                    "-f", format_id,
+                    "-o", "-",
+                    url,
+                    stdout=pipe_w,
+                    stderr=asyncio.subprocess.PIPE,
+                    preexec_fn=_niceify,
+                )
+                ffmpeg = await asyncio.create_subprocess_exec(
+                    "ffmpeg",
+                    "-loglevel", "error",
+                    "-i", "pipe:0",
+                    "-f", "mp3",
+                    "-vn",
+                    "-acodec", "libmp3lame",
+                    "-b:a", "192k",
+                    "pipe:1",
+                    stdin=pipe_r,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.DEVNULL,
+                    preexec_fn=_niceify,
+                )
+            finally:
+                # Parent copies of the pipe ends must close so ffmpeg sees EOF
+                # when yt-dlp finishes.
+                os.close(pipe_r)
+                os.close(pipe_w)
+
+            stderr_tail: deque[bytes] = deque(maxlen=50)
+            drain_task = asyncio.create_task(_drain_stderr(ytdlp, stderr_tail))
+
+            try:
+                first_chunk = await asyncio.wait_for(
+                    ffmpeg.stdout.read(1 << 20), timeout=300
+                )
+            except asyncio.TimeoutError:
+                raise HTTPException(
+                    status_code=504, detail="Download timed out (5 min limit)"
+                )
+            if not first_chunk:
+                await ytdlp.wait()
+                await ffmpeg.wait()
+                await drain_task
+                detail = b"".join(stderr_tail).decode(errors="replace")[-500:]
+                raise HTTPException(status_code=500, detail=f"Download failed: {detail}")
+        except BaseException:
+            # A failed ffmpeg spawn, timeout or cancellation here would leave
+            # yt-dlp blocked on a reader-less pipe forever — kill both before
+            # the error propagates.
+            for p in (ytdlp, ffmpeg):
+                if p is not None and p.returncode is None:
+                    p.kill()
+                    await p.wait()
+            if drain_task is not None:
+                drain_task.cancel()
+            raise
+        finally:
+            DL_SEM.release()
+
+        async def stream_audio():
+            try:
+                yield first_chunk
+                while chunk := await ffmpeg.stdout.read(1 << 20):
+                    yield chunk
+                await ffmpeg.wait()
+            finally:
+                for p in (ytdlp, ffmpeg):
+                    if p.returncode is None:
+                        p.kill()
+                        await p.wait()
+                drain_task.cancel()
+
+        filename, media_type = _stream_filename(url, format_id, ext="mp3")
+        return StreamingResponse(
+            stream_audio(),
+            media_type=media_type,
+            headers={"Content-Disposition": content_disposition(filename)},
+        )
+
+    # ── yt-dlp download (tmp file: merged video+audio path) ────────────────────
+    # Identical concurrent requests collapse onto one yt-dlp run: later
+    # arrivals wait for the first one's staged file and stream the same bytes.
+    flight_key = (url, format_id or "")
+    flight = _join_inflight(flight_key)
+    if flight is not None:
+        try:
+            filepath, filename, media_type = await asyncio.shield(flight["fut"])
+        except HTTPException:
+            # Leader failed with a specific error — give waiters the same one.
+            await _release_inflight(flight_key, flight)
+            raise
+        except asyncio.CancelledError:
+            await _release_inflight(flight_key, flight)
+            if not flight["fut"].cancelled():
+                # The future is fine; it's this waiter's own request that was
+                # cancelled — let the cancellation propagate.
+                raise
+            raise HTTPException(status_code=500, detail="Download failed")
+        except Exception:
+            await _release_inflight(flight_key, flight)
+            raise HTTPException(status_code=500, detail="Download failed")
+        return FileResponse(
+            filepath,
+            media_type=media_type,
+            headers={"Content-Disposition": content_disposition(filename)},
+            background=BackgroundTask(_release_inflight, flight_key, flight),
+        )
+
+    flight = {
+        "fut": asyncio.get_running_loop().create_future(),
+        "refs": 1,
+        "tmp_dir": None,
+    }
+    _inflight[flight_key] = flight
+
+    # mkdtemp does one atomic mkdir syscall and respects TMPDIR, so staging
+    # can be pointed at a tmpfs (e.g. TMPDIR=/dev/shm) to skip disk entirely.
+    tmp_dir = Path(tempfile.mkdtemp(prefix="linkdrop-"))
+    flight["tmp_dir"] = tmp_dir
 
+    proc = None
     try:
-        flags = build_ytdlp_flags(platform)
+        flags = _FLAGS_CACHE[platform]
         cmd = [
-            YTDLP,
-            "--no-playlist",
-            "--no-warnings",
+            _ytdlp_path(),
+            *_DL_ARGS,
             *flags,
             "-o", str(tmp_dir / "%(title).80s.%(ext)s"),
             "--merge-output-format", "mp4",
         ]
 
-        if format_id and "bestaudio" in format_id and "+" not in format_id:
-            # Audio-only download — extract as mp3
-            cmd.extend(["-f", format_id, "--extract-audio", "--audio-format", "mp3"])
-        elif format_id:
+        if format_id:
             cmd.extend(["-f", format_id])
         else:
             cmd.extend(["-f", "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best"])
 
         cmd.append(url)
 
-        proc = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-        )
-        _, stderr = await asyncio.wait_for(proc.communicate(), timeout=300)
+        async with DL_SEM:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+                preexec_fn=_niceify,
+            )
+            stderr_tail: deque[bytes] = deque(maxlen=50)
+            drain_task = asyncio.create_task(_drain_stderr(proc, stderr_tail))
+            await asyncio.wait_for(proc.wait(), timeout=300)
+            await drain_task
 
         if proc.returncode != 0:
+            detail = b"".join(stderr_tail).decode(errors="replace")[-500:]
             raise HTTPException(
                 status_code=500,
-                detail=f"Download failed: {stderr.decode()[-500:]}",
+                detail=f"Download failed: {detail}",
             )
 
-        files = list(tmp_dir.iterdir())
-        if not files:
+        # scandir returns the single expected entry without materialising a
+        # list of Path objects (and its DirEntry carries a cached stat).
+        with os.scandir(tmp_dir) as it:
+            entry = next((e for e in it if e.is_file()), None)
+        if entry is None:
             raise HTTPException(status_code=500, detail="No file downloaded")
 
-        filepath = files[0]
-        filename = filepath.name
-        ext = filepath.suffix.lower()
-
-        content_type_map = {
-            ".mp4": "video/mp4",
-            ".webm": "video/webm",
-            ".mkv": "video/x-matroska",
-            ".mp3": "audio/mpeg",
-            ".m4a": "audio/mp4",
-            ".opus": "audio/opus",
-        }
-        media_type = content_type_map.get(ext, "application/octet-stream")
-        file_size = filepath.stat().st_size
+        filepath = Path(entry.path)
+        filename = entry.name
+        media_type = CONTENT_TYPE_MAP.get(
+            filepath.suffix.lower(), "application/octet-stream"
+        )
 
-        async def file_stream():
-            try:
-                async with aiofiles.open(filepath, "rb") as f:
-                    while chunk := await f.read(65536):
-                        yield chunk
-            finally:
-                shutil.rmtree(tmp_dir, ignore_errors=True)
+        flight["fut"].set_result((filepath, filename, media_type))
 
-        return StreamingResponse(
-            file_stream(),
+        # FileResponse lets the ASGI server use sendfile(2): bytes go straight
+        # from page cache to socket instead of round-tripping through Python.
+        return FileResponse(
+            filepath,
             media_type=media_type,
-            headers={
-                "Content-Disposition": content_disposition(filename),
-                "Content-Length": str(file_size),
-            },
+            headers={"Content-Disposition": content_disposition(filename)},
+            background=BackgroundTask(_release_inflight, flight_key, flight),
         )
 
-    except asyncio.TimeoutError:
-        shutil.rmtree(tmp_dir, ignore_errors=True)
-        raise HTTPException(status_code=504, detail="Download timed out (5 min limit)")
-    except HTTPException:
-        shutil.rmtree(tmp_dir, ignore_errors=True)
-        raise
-    except Exception as e:
-        shutil.rmtree(tmp_dir, ignore_errors=True)
-        raise HTTPException(status_code=500, detail=str(e))
+    except BaseException as e:
+        # Single cleanup path for every failure mode (timeout, yt-dlp error,
+        # cancellation): drop the flight so waiters retry, then rm the staging
+        # dir off-thread. Cancellation lands here when the last client
+        # disconnects mid-stage — kill yt-dlp rather than let it run to
+        # completion for nobody.
+        if proc is not None and proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+        if isinstance(e, asyncio.TimeoutError):
+            http_exc = HTTPException(
+                status_code=504, detail="Download timed out (5 min limit)"
+            )
+        elif isinstance(e, HTTPException):
+            http_exc = e
+        elif isinstance(e, asyncio.CancelledError):
+            http_exc = None
+        else:
+            http_exc = HTTPException(status_code=500, detail=str(e))
+        _fail_inflight(flight_key, flight, http_exc)
+        await _rmtree(tmp_dir)
+        if http_exc is None:
+            raise
+        raise http_exc